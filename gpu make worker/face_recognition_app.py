@@ -1,14 +1,44 @@
 import os
 import sys
+import io
 import cv2
 import numpy as np
 import pickle
+import json
 import insightface
+import onnxruntime
+from insightface.app.common import Face
+from insightface.utils import face_align
 import time
 import threading
+import queue
 import logging
 from datetime import datetime
 
+# SimSIMD provides SIMD cosine kernels; fall back to NumPy when it is not installed
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+# PyTorch is only used to search large face databases on the GPU
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# Numba compiles the tracker matching kernel; NumPy is used when it is not installed
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# FAISS provides the approximate index used for very large face databases
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -21,49 +51,269 @@ CAMERA_TYPE_DROIDCAM = 'droidcam'
 DEFAULT_CAMERA_TYPE = CAMERA_TYPE_DROIDCAM
 DEFAULT_DROIDCAM_URL = "http://192.168.18.76:4747/video"
 
+# Ask FFmpeg not to buffer the MJPEG stream so reads return the newest frame
+os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "fflags;nobuffer|flags;low_delay")
+
+# DroidCam reconnect policy: only reopen the stream after several consecutive
+# failed reads, backing off exponentially between attempts
+DROIDCAM_MAX_FAILURES = 3
+DROIDCAM_GRACE_PERIOD = 0.5
+DROIDCAM_RECONNECT_DELAY = 0.5
+DROIDCAM_MAX_RECONNECT_DELAY = 8.0
+
 # Face database directory
 FACES_DB_DIR = "faces_db"
 os.makedirs(FACES_DB_DIR, exist_ok=True)
 
+# Face database layout: every embedding lives in one (N, D) matrix that is
+# memory-mapped on load, grouped by identity in the order listed in meta.json
+EMBEDDINGS_FILE = os.path.join(FACES_DB_DIR, "embeddings.npy")
+QUANTIZED_EMBEDDINGS_FILE = os.path.join(FACES_DB_DIR, "embeddings_q.npy")
+META_FILE = os.path.join(FACES_DB_DIR, "meta.json")
+
+# Approximate nearest-neighbour index over the matching embeddings, built for
+# very large databases; removed whenever the database is rewritten
+FAISS_INDEX_FILE = os.path.join(FACES_DB_DIR, "emb.index")
+
+# Optional PCA projection applied to embeddings before matching, fitted on the
+# stored gallery by reduce_embedding_dim(); the stored matrices stay full size
+PROJECTION_FILE = os.path.join(FACES_DB_DIR, "projection.npz")
+
+# Older pickle database, migrated to the layout above on first load
+LEGACY_DB_FILE = os.path.join(FACES_DB_DIR, "face_database.pkl")
+
+# Size of the buffalo_l ArcFace embeddings
+EMBEDDING_DIM = 512
+
+# Default target size for reduce_embedding_dim()
+REDUCED_EMBEDDING_DIM = 128
+
+# Face databases with more samples than this are searched on the GPU when available
+GPU_MATCH_MIN_ROWS = 1000
+
+# CPU face matching scans the database in blocks of this many samples and stops
+# at the first block containing a match above EARLY_EXIT_SIMILARITY
+MATCH_BLOCK_ROWS = 4096
+EARLY_EXIT_SIMILARITY = 0.85
+
+# Face databases with at least this many samples are searched through an
+# IVF-PQ index when FAISS is installed; the ANN_CANDIDATES best approximate
+# hits are rescored exactly. Training the PQ codebooks needs at least 256
+# samples, so this must stay above that
+ANN_MIN_ROWS = 50000
+ANN_NPROBE = 16
+ANN_CANDIDATES = 5
+
+# A face whose similarity to an identity's mean embedding is above this is
+# matched against that identity's samples only
+CENTROID_MATCH_SIMILARITY = 0.6
+
 # Temp directory for processing
 TEMP_DIR = "temp_images"
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+# Input size of the face detector
+DETECTION_SIZE = (320, 320)
+
+# Shared InsightFace model, built once per process
+_face_app = None
+_face_app_lock = threading.Lock()
+
 # Load InsightFace model
 def get_face_analysis():
-    face_app = FaceAnalysis(name='buffalo_l', providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
-    face_app.prepare(ctx_id=0, det_size=(320, 320))
-    return face_app
+    """
+    Return the process-wide FaceAnalysis instance, loading it on first use.
+    
+    Keeping one instance means the ONNX sessions and CUDA context survive
+    across add/recognize cycles instead of being rebuilt every time.
+    """
+    global _face_app
+    
+    with _face_app_lock:
+        if _face_app is None:
+            face_app = FaceAnalysis(name='buffalo_l', providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
+            face_app.prepare(ctx_id=0, det_size=DETECTION_SIZE)
+            
+            # Run dummy inputs through detection and recognition so cuDNN
+            # algorithm search happens here rather than on the first real frame
+            face_app.get(np.zeros((DETECTION_SIZE[1], DETECTION_SIZE[0], 3), dtype=np.uint8))
+            rec_model = face_app.models['recognition']
+            face_app.recognition_runner.run(
+                np.zeros((1, 3, rec_model.input_size[1], rec_model.input_size[0]), dtype=np.float32))
+            
+            _face_app = face_app
+        
+        return _face_app
+
+# Detect faces and embed them with a single batched recognition call
+def detect_faces(face_app, frame, embed=True):
+    """
+    Detect faces in a frame and compute their embeddings in one batch.
+    
+    FaceAnalysis.get() runs the recognition model once per detected face (and
+    also runs the landmark/attribute models, which we don't use). Here the
+    detector runs once and all aligned crops go through ArcFace together.
+    
+    Args:
+        face_app: Prepared FaceAnalysis instance
+        frame: BGR image
+        embed: Compute embeddings now; pass False to batch them across
+            frames later with embed_faces()
+    
+    Returns:
+        List of insightface Face objects, with embeddings set if embed is True
+    """
+    # The detector works at DETECTION_SIZE anyway, so shrink large frames
+    # first and only keep the full-resolution frame for the recognition crops
+    height, width = frame.shape[:2]
+    scale = min(1.0, DETECTION_SIZE[0] / width)
+    if scale < 1.0:
+        small = cv2.resize(frame, (DETECTION_SIZE[0], int(round(height * scale))), interpolation=cv2.INTER_LINEAR)
+    else:
+        small = frame
+    
+    bboxes, kpss = face_app.det_model.detect(small, max_num=0, metric='default')
+    if bboxes.shape[0] == 0:
+        return []
+    
+    # Alignment needs the 5-point landmarks; without them use the stock path
+    if kpss is None:
+        return face_app.get(frame)
+    
+    # Map detections back to full-resolution coordinates
+    if scale < 1.0:
+        bboxes[:, 0:4] /= scale
+        kpss = kpss / scale
+    
+    faces = [Face(bbox=bboxes[i, 0:4], kps=kpss[i], det_score=bboxes[i, 4]) for i in range(bboxes.shape[0])]
+    
+    if embed:
+        embed_faces(face_app, [(frame, face) for face in faces])
+    
+    return faces
+
+def embed_faces(face_app, detections):
+    """
+    Compute embeddings for detected faces with one batched recognition run.
+    
+    Args:
+        face_app: Prepared FaceAnalysis instance
+        detections: List of (frame, face) pairs; the faces may come from
+            different frames. Faces that already have an embedding are skipped.
+    """
+    detections = [(frame, face) for frame, face in detections if face.embedding is None]
+    if not detections:
+        return
+    
+    rec_model = face_app.models['recognition']
+    crops = [face_align.norm_crop(frame, landmark=face.kps, image_size=rec_model.input_size[0])
+             for frame, face in detections]
+    
+    # Build the (N, 3, H, W) RGB batch, mean/std normalized like ArcFaceONNX
+    # does, in one OpenCV call
+    batch = cv2.dnn.blobFromImages(crops, 1.0 / rec_model.input_std, rec_model.input_size,
+                                   (rec_model.input_mean, rec_model.input_mean, rec_model.input_mean), swapRB=True)
+    
+    embeddings = face_app.recognition_runner.run(batch)
+    for (_, face), embedding in zip(detections, embeddings):
+        face.embedding = embedding
 
 # Camera classes
 class DroidCam:
     def __init__(self, url=DEFAULT_DROIDCAM_URL):
         self.url = url
-        self.cap = cv2.VideoCapture(url)
+        self.cap = self._open()
         logger.info(f"Initialized DroidCam with URL: {url}")
         
         # Check if camera opened successfully
         if not self.cap.isOpened():
             logger.error(f"Failed to open DroidCam at {url}")
             raise Exception(f"Failed to open DroidCam at {url}")
+        
+        # Failure tracking for the reconnect policy
+        self._failures = 0
+        self._last_good = time.time()
+        self._next_reconnect = 0
+        self._reconnect_delay = DROIDCAM_RECONNECT_DELAY
+        
+        # Keep grabbing in the background so stale frames are discarded and
+        # read() only has to decode the most recent one
+        self._lock = threading.Lock()
+        self._new_frame = threading.Event()
+        self._grabbing = True
+        self._grab_thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self._grab_thread.start()
+    
+    def _open(self):
+        cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+    
+    def _grab_loop(self):
+        while self._grabbing:
+            with self._lock:
+                grabbed = self.cap.isOpened() and self.cap.grab()
+            if grabbed:
+                self._new_frame.set()
+            else:
+                time.sleep(0.01)
+    
+    def _reconnect(self):
+        # A read racing release() must not reopen the stream
+        if not self._grabbing:
+            return
+        
+        now = time.time()
+        if now < self._next_reconnect:
+            return
+        
+        logger.warning(f"Reconnecting to DroidCam at {self.url}")
+        try:
+            with self._lock:
+                if not self._grabbing:
+                    return
+                self.cap.release()
+                self.cap = self._open()
+            if self.cap.isOpened():
+                self._failures = 0
+        except Exception as e:
+            logger.error(f"Error reconnecting to DroidCam: {e}")
+        
+        self._next_reconnect = now + self._reconnect_delay
+        self._reconnect_delay = min(self._reconnect_delay * 2, DROIDCAM_MAX_RECONNECT_DELAY)
     
     def read(self):
-        if not self.cap.isOpened():
-            try:
-                self.cap = cv2.VideoCapture(self.url)
-                if not self.cap.isOpened():
-                    return False, None
-            except Exception as e:
-                logger.error(f"Error reconnecting to DroidCam: {e}")
-                return False, None
+        # Wait for a frame newer than the last one returned
+        if self.cap.isOpened() and self._new_frame.wait(timeout=1.0):
+            with self._lock:
+                self._new_frame.clear()
+                ret, frame = self.cap.retrieve()
+            
+            if ret:
+                self._failures = 0
+                self._last_good = time.time()
+                self._reconnect_delay = DROIDCAM_RECONNECT_DELAY
+                return ret, frame
         
-        return self.cap.read()
+        # Reopening an HTTP stream costs a handshake and codec init, so treat
+        # short hiccups as transient and let the caller retry
+        self._failures += 1
+        if self._failures > DROIDCAM_MAX_FAILURES and time.time() - self._last_good >= DROIDCAM_GRACE_PERIOD:
+            self._reconnect()
+        
+        return False, None
     
     def isOpened(self):
         return self.cap.isOpened()
     
     def release(self):
-        self.cap.release()
+        self._grabbing = False
+        self._grab_thread.join(timeout=1.0)
+        
+        # grab() can still be blocked on a bad link after the join times out;
+        # the capture must not be released underneath it
+        with self._lock:
+            self.cap.release()
 
 class LaptopCamera:
     def __init__(self, camera_id=0):
@@ -94,66 +344,671 @@ class LaptopCamera:
     def release(self):
         self.cap.release()
 
+# Background reader that keeps pulling frames while the caller runs inference
+class FrameReader:
+    def __init__(self, camera, max_queued=2):
+        self.camera = camera
+        # Bounded so a slow consumer gets recent frames instead of a backlog
+        self.frames = queue.Queue(maxsize=max_queued)
+        self.running = True
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.thread.start()
+    
+    def _read_loop(self):
+        while self.running:
+            ret, frame = self.camera.read()
+            if not ret or frame is None:
+                logger.error("Failed to grab frame")
+                time.sleep(0.1)
+                continue
+            
+            # Drop the oldest frame when the consumer falls behind to keep latency low
+            if self.frames.full():
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+            try:
+                self.frames.put_nowait(frame)
+            except queue.Full:
+                pass
+    
+    def read(self, timeout=1.0):
+        try:
+            return True, self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+    
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1.0)
+
+# Assign each new embedding to its most similar track above a threshold
+def _match_tracks(track_embs, new_embs, threshold):
+    assignments = np.full(new_embs.shape[0], -1, dtype=np.int64)
+    for i in range(new_embs.shape[0]):
+        best_similarity = threshold
+        for t in range(track_embs.shape[0]):
+            similarity = 0.0
+            for k in range(track_embs.shape[1]):
+                similarity += track_embs[t, k] * new_embs[i, k]
+            if similarity > best_similarity:
+                best_similarity = similarity
+                assignments[i] = t
+    return assignments
+
+if njit is not None:
+    match_tracks = njit(cache=True, fastmath=True)(_match_tracks)
+else:
+    def match_tracks(track_embs, new_embs, threshold):
+        if track_embs.shape[0] == 0:
+            return np.full(new_embs.shape[0], -1, dtype=np.int64)
+        similarities = new_embs @ track_embs.T
+        best = similarities.argmax(axis=1)
+        best_similarities = similarities[np.arange(new_embs.shape[0]), best]
+        return np.where(best_similarities > threshold, best, -1)
+
 # Face tracker class for better performance
 class FaceTracker:
-    def __init__(self, max_age=30):
+    def __init__(self, max_age=30, refresh_interval=10):
         self.max_age = max_age
+        # Number of frames a track reuses its database match before searching again
+        self.refresh_interval = refresh_interval
         self.tracks = {}
         self.next_id = 0
+        # Track embeddings as one (T, D) matrix; row i belongs to track_ids[i]
+        self.track_ids = []
+        self.track_embs = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    
+    def _rebuild_track_index(self):
+        """Restack track embeddings into track_embs and point each track at its row"""
+        self.track_ids = list(self.tracks.keys())
+        if self.track_ids:
+            self.track_embs = np.ascontiguousarray(
+                np.stack([self.tracks[track_id]['embedding'] for track_id in self.track_ids]), dtype=np.float32)
+        else:
+            self.track_embs = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        
+        for row, track_id in enumerate(self.track_ids):
+            self.tracks[track_id]['embedding'] = self.track_embs[row]
     
     def update(self, faces):
         # Update age of all existing tracks
+        expired = False
         for track_id in list(self.tracks.keys()):
             self.tracks[track_id]['age'] += 1
             # Remove old tracks
             if self.tracks[track_id]['age'] > self.max_age:
                 del self.tracks[track_id]
+                expired = True
+        
+        if expired:
+            self._rebuild_track_index()
         
         # Empty faces list, just update ages
         if not faces:
             return self.tracks
         
-        # Process new detections
-        for face in faces:
-            # Get embedding from face
-            embedding = face.normed_embedding
-            
-            # Find closest matching track
-            best_match_id = None
-            best_match_dist = float('inf')
-            
-            for track_id, track_data in self.tracks.items():
-                # Calculate cosine distance (1 - dot product for normalized vectors)
-                dist = 1.0 - np.dot(embedding, track_data['embedding'])
-                
-                if dist < best_match_dist and dist < 0.3:  # Distance threshold
-                    best_match_dist = dist
-                    best_match_id = track_id
-            
-            # Update matched track or create new track
-            if best_match_id is not None:
+        # Find the closest matching track for every detection at once
+        # (cosine distance < 0.3 means similarity > 0.7)
+        embeddings = np.ascontiguousarray(np.stack([face.normed_embedding for face in faces]), dtype=np.float32)
+        assignments = match_tracks(self.track_embs, embeddings, 0.7)
+        
+        # Update matched tracks or create new tracks
+        created = False
+        for face, embedding, best_row in zip(faces, embeddings, assignments):
+            if best_row >= 0:
                 # Update existing track
-                self.tracks[best_match_id]['age'] = 0
-                self.tracks[best_match_id]['face_obj'] = face
-                # Update embedding with moving average
+                track = self.tracks[self.track_ids[best_row]]
+                track['age'] = 0
+                track['face_obj'] = face
+                # Update embedding with moving average, in place on the track's
+                # row (the track's 'embedding' is a view of it)
                 alpha = 0.7  # Weight for new embedding
-                old_emb = self.tracks[best_match_id]['embedding']
-                new_emb = alpha * embedding + (1 - alpha) * old_emb
-                self.tracks[best_match_id]['embedding'] = new_emb / np.linalg.norm(new_emb)
+                new_emb = self.track_embs[best_row]
+                new_emb *= (1 - alpha)
+                new_emb += alpha * embedding
+                new_emb *= 1.0 / np.sqrt(new_emb @ new_emb)
             else:
                 # Create new track
                 self.tracks[self.next_id] = {
                     'face_obj': face,
                     'embedding': embedding,
-                    'age': 0
+                    'age': 0,
+                    'name': None,
+                    'score': 0,
+                    'match_age': 0
                 }
                 self.next_id += 1
+                created = True
+        
+        if created:
+            self._rebuild_track_index()
         
         return self.tracks
+    
+    def identify(self, track_data, face_matcher):
+        """
+        Get the database match for a track.
+        
+        Identity doesn't change within a track, so the database is searched
+        only for new tracks and then every refresh_interval frames.
+        
+        Returns:
+            Tuple of (display name, similarity)
+        """
+        if track_data['name'] is None or track_data['match_age'] >= self.refresh_interval:
+            track_data['name'], track_data['score'] = face_matcher.match(track_data['embedding'])
+            track_data['match_age'] = 0
+        else:
+            track_data['match_age'] += 1
+        
+        return track_data['name'], track_data['score']
+
+# Face database helpers
+def _to_epoch(timestamp):
+    """Older databases store sample timestamps as "%Y%m%d_%H%M%S" strings"""
+    if isinstance(timestamp, str):
+        return datetime.strptime(timestamp, "%Y%m%d_%H%M%S").timestamp()
+    return float(timestamp)
+
+def quantize_embeddings(embeddings):
+    """
+    Quantize float embeddings to int8, scaling each vector so its largest component maps to 127.
+    
+    Components of a unit 512-D vector rarely exceed 0.2, so a fixed scale of
+    127 would leave most of the int8 range unused. The scale isn't stored:
+    the quantized vectors are only compared by cosine, which ignores it.
+    """
+    scale = 127 / np.maximum(np.abs(embeddings).max(axis=-1, keepdims=True), 1e-12)
+    return np.clip(np.round(embeddings * scale), -127, 127).astype(np.int8)
+
+def _to_soa_entry(data):
+    """Convert a legacy entry holding a list of (embedding, timestamp) tuples to arrays"""
+    samples = data["embeddings"]
+    if not isinstance(samples, np.ndarray):
+        if samples:
+            data["embeddings"] = np.stack([embedding for embedding, _ in samples]).astype(np.float32)
+            data["timestamps"] = np.array([_to_epoch(timestamp) for _, timestamp in samples], dtype=np.float64)
+        else:
+            data["embeddings"] = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+            data["timestamps"] = np.empty((0,), dtype=np.float64)
+    
+    if "embeddings_q" not in data:
+        data["embeddings_q"] = quantize_embeddings(data["embeddings"])
+    data.setdefault("image_paths", [])
+    return data
+
+class _LegacyFaceDbUnpickler(pickle.Unpickler):
+    """Unpickler that only rebuilds NumPy arrays, so a tampered legacy file can't run code"""
+    
+    ALLOWED_GLOBALS = {
+        ("numpy", "ndarray"),
+        ("numpy", "dtype"),
+        ("numpy.core.multiarray", "_reconstruct"),
+        ("numpy.core.multiarray", "scalar"),
+        ("numpy._core.multiarray", "_reconstruct"),
+        ("numpy._core.multiarray", "scalar"),
+        # Protocol 2 and older encode the raw array bytes through this
+        ("_codecs", "encode"),
+        # Protocol 5 pickles rebuild arrays directly over the pickled buffer
+        ("numpy.core.numeric", "_frombuffer"),
+        ("numpy._core.numeric", "_frombuffer"),
+    }
+    
+    def find_class(self, module, name):
+        if (module, name) not in self.ALLOWED_GLOBALS:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from legacy face database")
+        return super().find_class(module, name)
+
+def _load_legacy_face_db(db_file=LEGACY_DB_FILE):
+    """Load a pickled face database, converting list-of-tuples entries to arrays"""
+    # One read of the whole file instead of the unpickler's many small buffered reads
+    with open(db_file, 'rb') as f:
+        raw = f.read()
+    face_db = _LegacyFaceDbUnpickler(io.BytesIO(raw)).load()
+    
+    for data in face_db.values():
+        _to_soa_entry(data)
+    
+    return face_db
+
+def _atomic_write(path, write):
+    """Write a file via a temporary file so readers never see a partial write"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def face_db_exists():
+    """Check whether a face database (current or legacy format) is present"""
+    return os.path.exists(META_FILE) or os.path.exists(LEGACY_DB_FILE)
+
+def _migrate_legacy_face_db():
+    """Convert a legacy pickle database to the current layout if that hasn't happened yet"""
+    if not os.path.exists(META_FILE) and os.path.exists(LEGACY_DB_FILE):
+        logger.info(f"Migrating {LEGACY_DB_FILE} to {META_FILE}")
+        save_face_db(_load_legacy_face_db())
+
+def load_face_meta():
+    """
+    Load only the face metadata, without touching the embedding files.
+    
+    Returns:
+        List of {"id", "display_name", "sample_count", "image_path",
+        "timestamps", "image_paths"} dicts, in matrix row order
+    """
+    _migrate_legacy_face_db()
+    
+    # Read the raw bytes in one call; json decodes UTF-8 bytes itself
+    with open(META_FILE, 'rb') as f:
+        faces = json.loads(f.read())["faces"]
+    
+    # Summary fields are missing from databases written before they existed
+    for face in faces:
+        face.setdefault("sample_count", len(face["timestamps"]))
+        face.setdefault("image_path", face["image_paths"][0] if face["image_paths"] else None)
+    
+    return faces
+
+def load_face_db(mmap=True):
+    """
+    Load the face database.
+    
+    Each entry maps a db_name to {"display_name", "embeddings" (K, D) float32,
+    "embeddings_q" (K, D) int8, "timestamps" (K,) float64, "image_paths"}.
+    With mmap=True the embedding arrays are read-only views into the
+    memory-mapped matrix files, so nothing is copied until it is used. A legacy
+    pickle database is migrated to the new layout on first load.
+    """
+    return _load_face_db(mmap)[0]
+
+def load_face_matcher():
+    """Build a FaceMatcher that matches directly against the memory-mapped embedding matrices"""
+    face_db, embeddings, quantized = _load_face_db(mmap=True)
+    return FaceMatcher(face_db, embeddings, quantized)
+
+def _load_face_db(mmap):
+    """load_face_db(), also returning the full (N, D) float32 and int8 matrices its entries are views of"""
+    faces = load_face_meta()
+    
+    mmap_mode = 'r' if mmap else None
+    embeddings = np.load(EMBEDDINGS_FILE, mmap_mode=mmap_mode, allow_pickle=False)
+    quantized = np.load(QUANTIZED_EMBEDDINGS_FILE, mmap_mode=mmap_mode, allow_pickle=False)
+    
+    total = sum(face["sample_count"] for face in faces)
+    if total != embeddings.shape[0] or total != quantized.shape[0]:
+        raise ValueError(f"Face database is inconsistent: {META_FILE} lists {total} samples, "
+                         f"{EMBEDDINGS_FILE} holds {embeddings.shape[0]}")
+    
+    face_db = {}
+    offset = 0
+    for face in faces:
+        count = face["sample_count"]
+        face_db[face["id"]] = {
+            "display_name": face["display_name"],
+            "embeddings": embeddings[offset:offset + count],
+            "embeddings_q": quantized[offset:offset + count],
+            "timestamps": np.asarray(face["timestamps"], dtype=np.float64),
+            "image_paths": face["image_paths"]
+        }
+        offset += count
+    
+    return face_db, embeddings, quantized
+
+def save_face_db(face_db):
+    """Save the face database as embedding matrices plus a JSON metadata file"""
+    faces = []
+    blocks = []
+    quantized_blocks = []
+    for db_name, data in face_db.items():
+        faces.append({
+            "id": db_name,
+            "display_name": data.get("display_name", db_name),
+            "sample_count": len(data["embeddings"]),
+            "image_path": data["image_paths"][0] if data["image_paths"] else None,
+            "timestamps": [float(timestamp) for timestamp in data["timestamps"]],
+            "image_paths": list(data["image_paths"])
+        })
+        blocks.append(data["embeddings"])
+        quantized_blocks.append(data["embeddings_q"])
+    
+    if blocks:
+        embeddings = np.ascontiguousarray(np.concatenate(blocks), dtype=np.float32)
+        quantized = np.ascontiguousarray(np.concatenate(quantized_blocks), dtype=np.int8)
+    else:
+        embeddings = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        quantized = np.empty((0, EMBEDDING_DIM), dtype=np.int8)
+    
+    # An index over the previous rows would map to the wrong samples
+    if os.path.exists(FAISS_INDEX_FILE):
+        os.remove(FAISS_INDEX_FILE)
+    
+    # Metadata goes last: it is what makes the new matrices visible to readers
+    _atomic_write(EMBEDDINGS_FILE, lambda f: np.save(f, embeddings))
+    _atomic_write(QUANTIZED_EMBEDDINGS_FILE, lambda f: np.save(f, quantized))
+    _atomic_write(META_FILE, lambda f: f.write(json.dumps({"faces": faces}, indent=2).encode('utf-8')))
+
+def load_projection():
+    """Load the (mean, components) PCA projection, or None if matching uses full-size embeddings"""
+    if not os.path.exists(PROJECTION_FILE):
+        return None
+    with np.load(PROJECTION_FILE, allow_pickle=False) as data:
+        return data["mean"], data["components"]
+
+def project_embeddings(embeddings, projection):
+    """Project (N, D) or (D,) embeddings with a PCA projection and renormalize them"""
+    mean, components = projection
+    projected = np.ascontiguousarray((embeddings - mean) @ components, dtype=np.float32)
+    norms = np.linalg.norm(projected, axis=-1, keepdims=True)
+    return projected / np.maximum(norms, 1e-12)
+
+def reduce_embedding_dim(dim=REDUCED_EMBEDDING_DIM):
+    """
+    Fit a PCA projection of the stored embeddings down to dim dimensions.
+    
+    FaceMatcher projects the gallery and every query with it, so matching
+    works on dim-sized vectors. The stored 512-D embeddings are kept so the
+    projection can be refitted as the gallery grows; dim >= EMBEDDING_DIM
+    removes the projection.
+    
+    Returns:
+        Dictionary with success status and message
+    """
+    if dim < 1:
+        return {"success": False, "message": f"Embedding size must be at least 1, got {dim}"}
+    
+    if dim >= EMBEDDING_DIM:
+        for path in (PROJECTION_FILE, FAISS_INDEX_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+        return {"success": True, "message": f"Matching uses full {EMBEDDING_DIM}-D embeddings"}
+    
+    if not face_db_exists():
+        return {"success": False, "message": "No face database found"}
+    
+    embeddings = np.concatenate([data["embeddings"] for data in load_face_db().values()])
+    
+    # Fewer samples than dimensions leaves most components undetermined
+    if len(embeddings) <= dim:
+        return {"success": False,
+                "message": f"Need more than {dim} stored samples to reduce to {dim}-D, have {len(embeddings)}"}
+    
+    mean = embeddings.mean(axis=0)
+    _, singular_values, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+    components = np.ascontiguousarray(vt[:dim].T, dtype=np.float32)
+    
+    variance = singular_values ** 2
+    retained = float(variance[:dim].sum() / variance.sum())
+    
+    _atomic_write(PROJECTION_FILE, lambda f: np.savez(f, mean=mean.astype(np.float32), components=components))
+    
+    # The index was built in the previous embedding space
+    if os.path.exists(FAISS_INDEX_FILE):
+        os.remove(FAISS_INDEX_FILE)
+    return {"success": True,
+            "message": f"Matching reduced to {dim}-D, keeping {retained:.1%} of the embedding variance"}
+
+def build_ann_index(embeddings):
+    """Train and fill an inner-product IVF-PQ index over (N, D) unit-normalized embeddings"""
+    n, dim = embeddings.shape
+    nlist = int(min(4096, max(1, 4 * np.sqrt(n))))
+    pq_subquantizers = 32 if dim % 32 == 0 else dim
+    index = faiss.index_factory(dim, f"IVF{nlist},PQ{pq_subquantizers}", faiss.METRIC_INNER_PRODUCT)
+    
+    # Training only needs a few hundred points per list
+    train = embeddings
+    if n > 256 * nlist:
+        train = embeddings[np.random.default_rng(0).choice(n, 256 * nlist, replace=False)]
+    index.train(np.ascontiguousarray(train))
+    index.add(embeddings)
+    return index
+
+def build_face_index():
+    """
+    Rebuild the FAISS index for the stored face database.
+    
+    Returns:
+        Dictionary with success status and message
+    """
+    if faiss is None:
+        return {"success": False, "message": "FAISS is not installed"}
+    if not face_db_exists():
+        return {"success": False, "message": "No face database found"}
+    
+    # Smaller galleries are scanned exactly, and FaceMatcher never loads an index for them
+    samples = sum(face["sample_count"] for face in load_face_meta())
+    if samples < ANN_MIN_ROWS:
+        return {"success": False,
+                "message": f"An index is only used from {ANN_MIN_ROWS} face samples, have {samples}"}
+    
+    # Index the vectors FaceMatcher searches: projected if a projection is
+    # fitted, and unit-normalized
+    _, embeddings, _ = _load_face_db(mmap=True)
+    projection = load_projection()
+    if projection is not None:
+        embeddings = project_embeddings(embeddings, projection)
+    norms = np.sqrt(np.einsum('ij,ij->i', embeddings, embeddings))
+    if not np.allclose(norms, 1.0, atol=1e-3):
+        embeddings = embeddings / norms[:, None]
+    
+    logger.info(f"Building FAISS index over {len(embeddings)} face samples")
+    index = build_ann_index(embeddings)
+    _save_ann_index(index)
+    
+    return {"success": True, "message": f"Indexed {index.ntotal} face samples"}
+
+def _save_ann_index(index):
+    """Write a FAISS index to FAISS_INDEX_FILE so readers never see a partial file"""
+    faiss.write_index(index, FAISS_INDEX_FILE + ".tmp")
+    os.replace(FAISS_INDEX_FILE + ".tmp", FAISS_INDEX_FILE)
+
+# Flattened view of the face database for vectorized matching
+class FaceMatcher:
+    def __init__(self, face_db, embeddings=None, quantized=None):
+        # One contiguous matrix of every identity's samples, with parallel
+        # arrays mapping each row back to its identity. embeddings and quantized,
+        # if given, already hold the blocks of face_db in order (the
+        # memory-mapped matrix files) and are used as they are; otherwise the
+        # blocks are concatenated
+        blocks = []
+        quantized_blocks = []
+        self.names = []
+        self.ids = []
+        
+        for db_name, data in face_db.items():
+            display_name = data.get("display_name", db_name)
+            count = len(data["embeddings"])
+            blocks.append(data["embeddings"])
+            quantized_blocks.append(data["embeddings_q"])
+            self.names.extend([display_name] * count)
+            self.ids.extend([db_name] * count)
+        
+        if embeddings is not None:
+            self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        elif self.names:
+            self.embeddings = np.ascontiguousarray(np.concatenate(blocks), dtype=np.float32)
+        else:
+            self.embeddings = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        
+        # With a fitted projection everything below works on the reduced
+        # vectors, and the stored int8 copy no longer applies
+        self.projection = load_projection()
+        if self.projection is not None:
+            self.embeddings = project_embeddings(self.embeddings, self.projection)
+        
+        # InsightFace stores normed_embedding, so the similarity is a plain dot
+        # product; only renormalize if an older database holds raw embeddings
+        norms = np.sqrt(np.einsum('ij,ij->i', self.embeddings, self.embeddings))
+        if not np.allclose(norms, 1.0, atol=1e-3):
+            logger.warning("Face database contains non-normalized embeddings, normalizing them")
+            self.embeddings = self.embeddings / norms[:, None]  # not in place, the matrix may be a read-only mapping
+            self.quantized = quantize_embeddings(self.embeddings)
+        elif self.names and self.projection is None:
+            if quantized is not None:
+                self.quantized = np.ascontiguousarray(quantized, dtype=np.int8)
+            else:
+                self.quantized = np.ascontiguousarray(np.concatenate(quantized_blocks))
+            
+            # Databases written with the old fixed scale have no row reaching 127
+            if len(self.quantized) and np.abs(self.quantized).max(axis=1).min() < 127:
+                self.quantized = quantize_embeddings(self.embeddings)
+        else:
+            self.quantized = quantize_embeddings(self.embeddings)
+        
+        # One normalized mean embedding per identity, with the row range of
+        # that identity's samples, for a cheap first pass over identities
+        self.identity_ranges = []
+        centroids = []
+        offset = 0
+        for block in blocks:
+            if len(block) > 0:
+                self.identity_ranges.append((offset, offset + len(block)))
+                centroid = self.embeddings[offset:offset + len(block)].mean(axis=0)
+                centroids.append(centroid / np.sqrt(centroid @ centroid))
+            offset += len(block)
+        
+        if centroids:
+            self.centroids = np.ascontiguousarray(np.stack(centroids), dtype=np.float32)
+        else:
+            self.centroids = np.empty((0, self.embeddings.shape[1]), dtype=np.float32)
+        
+        # Large galleries are searched on the GPU; for small ones the transfer
+        # costs more than the CPU product
+        self.gpu_embeddings = None
+        if len(self.embeddings) > GPU_MATCH_MIN_ROWS and torch is not None and torch.cuda.is_available():
+            self.gpu_embeddings = torch.from_numpy(self.embeddings).cuda()
+        
+        # Very large galleries go through the approximate index instead
+        self.index = None
+        if faiss is not None and len(self.embeddings) >= ANN_MIN_ROWS:
+            self.index = self._load_index()
+    
+    def _load_index(self):
+        """Load the persisted FAISS index if it matches these embeddings, otherwise build and save one"""
+        if os.path.exists(FAISS_INDEX_FILE):
+            index = faiss.read_index(FAISS_INDEX_FILE)
+            if index.ntotal == len(self.embeddings) and index.d == self.embeddings.shape[1]:
+                faiss.extract_index_ivf(index).nprobe = ANN_NPROBE
+                return index
+            logger.warning(f"{FAISS_INDEX_FILE} does not match the face database, rebuilding it")
+        
+        logger.info(f"Building FAISS index over {len(self.embeddings)} face samples")
+        index = build_ann_index(self.embeddings)
+        _save_ann_index(index)
+        faiss.extract_index_ivf(index).nprobe = ANN_NPROBE
+        return index
+    
+    def _similarities(self, query, query_q, start, stop):
+        """Cosine similarity of the query against stored samples start:stop, on the CPU"""
+        if query_q is not None:
+            # Batched int8 cosine distance of the query against the stored
+            # samples; quantizing unit vectors barely moves the cosine
+            distances = np.asarray(simsimd.cdist(query_q[None, :], self.quantized[start:stop], metric='cosine'))[0]
+            return 1.0 - distances
+        
+        # Embeddings are unit-normalized, so one matrix-vector product gives
+        # the cosine similarity against every stored sample
+        return self.embeddings[start:stop] @ query
+    
+    def _search_rows(self, query, query_q, start, stop):
+        """Best (row, similarity) among stored samples start:stop, on the CPU"""
+        idx, score = -1, -1.0
+        for block_start in range(start, stop, MATCH_BLOCK_ROWS):
+            block_stop = min(block_start + MATCH_BLOCK_ROWS, stop)
+            similarities = self._similarities(query, query_q, block_start, block_stop)
+            block_idx = int(similarities.argmax())
+            if similarities[block_idx] > score:
+                idx, score = block_start + block_idx, float(similarities[block_idx])
+            
+            # Samples of one identity are highly correlated, so the rest of
+            # the database can't meaningfully beat a near-perfect hit
+            if score > EARLY_EXIT_SIMILARITY:
+                break
+        
+        return idx, score
+    
+    def match(self, embedding, threshold=0.5):
+        """
+        Find the closest database embedding for a normalized face embedding.
+        
+        Returns:
+            Tuple of (display name, similarity), or ("Unknown", 0) if nothing
+            is above the threshold
+        """
+        if len(self.embeddings) == 0:
+            return "Unknown", 0
+        
+        query = np.ascontiguousarray(embedding, dtype=np.float32)
+        if self.projection is not None:
+            query = project_embeddings(query, self.projection)
+        query_q = quantize_embeddings(query) if simsimd is not None else None
+        
+        # First pass against one centroid per identity; a clear winner only
+        # needs its own samples scored to get the reported similarity
+        centroid_similarities = self.centroids @ query
+        best_identity = int(centroid_similarities.argmax())
+        
+        if centroid_similarities[best_identity] > CENTROID_MATCH_SIMILARITY:
+            start, stop = self.identity_ranges[best_identity]
+            idx, score = self._search_rows(query, query_q, start, stop)
+        elif self.index is not None:
+            # PQ scores are approximate, so rescore the candidates exactly
+            _, candidates = self.index.search(query[None, :], ANN_CANDIDATES)
+            candidates = candidates[0][candidates[0] >= 0]
+            if len(candidates) == 0:
+                return "Unknown", 0
+            similarities = self.embeddings[candidates] @ query
+            best = int(similarities.argmax())
+            idx, score = int(candidates[best]), float(similarities[best])
+        elif self.gpu_embeddings is not None:
+            # Full search; only the best score and its index come back from the device
+            similarities = self.gpu_embeddings @ torch.from_numpy(query).cuda()
+            score, idx = torch.topk(similarities, 1)
+            score, idx = float(score.item()), int(idx.item())
+        else:
+            idx, score = self._search_rows(query, query_q, 0, len(self.embeddings))
+        
+        if score > threshold:
+            return self.names[idx], score
+        return "Unknown", 0
+
+# Runs batches through the recognition model, keeping tensors on the GPU
+class RecognitionRunner:
+    def __init__(self, rec_model):
+        self.session = rec_model.session
+        self.input_name = rec_model.input_name
+        self.output_name = rec_model.output_names[0]
+        self.use_cuda = 'CUDAExecutionProvider' in self.session.get_providers()
+        self.lock = threading.Lock()
+        self.io_binding = None
+        self.input_value = None
+    
+    def run(self, batch):
+        """Run an (N, 3, H, W) float32 batch and return the (N, D) embeddings"""
+        if not self.use_cuda:
+            return self.session.run([self.output_name], {self.input_name: batch})[0]
+        
+        with self.lock:
+            # Reuse the device input buffer and binding while the batch shape
+            # stays the same; only the copy into it happens per frame
+            if self.input_value is None or self.input_value.shape() != list(batch.shape):
+                self.input_value = onnxruntime.OrtValue.ortvalue_from_numpy(batch, 'cuda', 0)
+                self.io_binding = self.session.io_binding()
+                self.io_binding.bind_ortvalue_input(self.input_name, self.input_value)
+                self.io_binding.bind_output(self.output_name, 'cuda', 0)
+            else:
+                self.input_value.update_inplace(batch)
+            
+            self.session.run_with_iobinding(self.io_binding)
+            return self.io_binding.copy_outputs_to_cpu()[0]
 
 # Create a wrapper around InsightFace for easier use
 class FaceAnalysis(insightface.app.FaceAnalysis):
-    pass
+    def prepare(self, ctx_id, **kwargs):
+        super().prepare(ctx_id, **kwargs)
+        # prepare() can change the session providers, so set up the runner after it
+        self.recognition_runner = RecognitionRunner(self.models['recognition'])
 
 # Add a face to the database
 def add_face(name, camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_DROIDCAM_URL, laptop_camera_id=0):
@@ -173,11 +1028,10 @@ def add_face(name, camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_DROIDCA
         # Initialize face recognition
         face_app = get_face_analysis()
         
-        # Create or load the face database
-        db_file = os.path.join(FACES_DB_DIR, "face_database.pkl")
-        if os.path.exists(db_file):
-            with open(db_file, 'rb') as f:
-                face_db = pickle.load(f)
+        # Create or load the face database; not memory-mapped since the
+        # matrix files get rewritten below
+        if face_db_exists():
+            face_db = load_face_db(mmap=False)
         else:
             face_db = {}
         
@@ -190,7 +1044,9 @@ def add_face(name, camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_DROIDCA
             # Create new entry
             face_db[db_name] = {
                 "display_name": name,
-                "embeddings": [],
+                "embeddings": np.empty((0, EMBEDDING_DIM), dtype=np.float32),
+                "embeddings_q": np.empty((0, EMBEDDING_DIM), dtype=np.int8),
+                "timestamps": np.empty((0,), dtype=np.float64),
                 "image_paths": []
             }
         
@@ -203,13 +1059,11 @@ def add_face(name, camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_DROIDCA
         if not camera.isOpened():
             return {"success": False, "message": "Could not open camera"}
         
-        # Capture multiple frames for better results
-        embeddings = []
-        images = []
-        
         logger.info("Capturing face images, please look at the camera...")
         
-        # Take multiple photos with a delay between them
+        # Take multiple photos with a delay between them first, so the models
+        # then run back to back instead of idling between captures
+        frames = []
         for i in range(5):
             # Wait a bit between captures to get different angles
             time.sleep(0.5)
@@ -219,49 +1073,56 @@ def add_face(name, camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_DROIDCA
             if not ret or frame is None:
                 continue
             
-            # Get face in frame
-            faces = face_app.get(frame)
+            frames.append((frame, datetime.now()))
+        
+        # Release camera
+        camera.release()
+        
+        # Find the face in each frame, using the face with largest area if
+        # multiple are detected
+        captures = []
+        for frame, captured_at in frames:
+            faces = detect_faces(face_app, frame, embed=False)
             
             if not faces:
                 continue
             
-            # Use the face with largest area if multiple detected
-            largest_face = None
-            largest_area = 0
+            largest_face = max(faces, key=lambda face: (face.bbox[2] - face.bbox[0]) * (face.bbox[3] - face.bbox[1]))
+            captures.append((frame, largest_face, captured_at))
+        
+        # Embed the faces from all frames in one batch
+        embed_faces(face_app, [(frame, face) for frame, face, _ in captures])
+        
+        embeddings = []
+        timestamps = []
+        images = []
+        
+        for frame, face, captured_at in captures:
+            # Save the face embedding
+            embeddings.append(face.normed_embedding)
+            timestamps.append(captured_at.timestamp())
             
-            for face in faces:
-                bbox = face.bbox.astype(int)
-                area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
-                
-                if area > largest_area:
-                    largest_area = area
-                    largest_face = face
+            # Save the face image
+            bbox = face.bbox.astype(int)
+            face_img = frame[bbox[1]:bbox[3], bbox[0]:bbox[2]]
             
-            if largest_face is not None:
-                # Save the face embedding
-                embeddings.append((largest_face.normed_embedding, time.time()))
-                
-                # Save the face image
-                bbox = largest_face.bbox.astype(int)
-                face_img = frame[bbox[1]:bbox[3], bbox[0]:bbox[2]]
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                img_filename = os.path.join(FACES_DB_DIR, f"{db_name}_{timestamp}.jpg")
-                cv2.imwrite(img_filename, face_img)
-                
-                images.append(img_filename)
-        
-        # Release camera
-        camera.release()
+            timestamp = captured_at.strftime("%Y%m%d_%H%M%S")
+            img_filename = os.path.join(FACES_DB_DIR, f"{db_name}_{timestamp}.jpg")
+            cv2.imwrite(img_filename, face_img)
+            
+            images.append(img_filename)
         
         # Update database
         if embeddings:
-            face_db[db_name]["embeddings"].extend(embeddings)
-            face_db[db_name]["image_paths"].extend(images)
+            entry = face_db[db_name]
+            new_embeddings = np.asarray(embeddings, dtype=np.float32)
+            entry["embeddings"] = np.vstack([entry["embeddings"], new_embeddings])
+            entry["embeddings_q"] = np.vstack([entry["embeddings_q"], quantize_embeddings(new_embeddings)])
+            entry["timestamps"] = np.concatenate([entry["timestamps"], np.asarray(timestamps, dtype=np.float64)])
+            entry["image_paths"].extend(images)
             
             # Save the database
-            with open(db_file, 'wb') as f:
-                pickle.dump(face_db, f)
+            save_face_db(face_db)
             
             return {"success": True, "message": f"Added {len(embeddings)} face samples for {name}"}
         else:
@@ -285,13 +1146,13 @@ def realtime_recognition(camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_D
     face_app = get_face_analysis()
     
     # Load the face database
-    db_file = os.path.join(FACES_DB_DIR, "face_database.pkl")
-    if not os.path.exists(db_file):
+    if not face_db_exists():
         logger.error("Face database not found")
         return
     
-    with open(db_file, 'rb') as f:
-        face_db = pickle.load(f)
+    face_db, embeddings, quantized = _load_face_db(mmap=True)
+    
+    face_matcher = FaceMatcher(face_db, embeddings, quantized)
     
     # Initialize camera
     if camera_type == CAMERA_TYPE_DROIDCAM:
@@ -314,6 +1175,11 @@ def realtime_recognition(camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_D
     start_time = time.time()
     fps = 0
     
+    # Detection runs on every 2nd frame; frames in between are displayed with
+    # the boxes and labels the tracker already has. Kept separate from the FPS
+    # counter, which resets.
+    frame_index = 0
+    
     # Print database info
     logger.info(f"Loaded database with {len(face_db)} identities:")
     for db_name, data in face_db.items():
@@ -340,14 +1206,16 @@ def realtime_recognition(camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_D
                 start_time = time.time()
             
             # Process every Nth frame for better performance
-            if frame_count % 2 != 0:  # Skip every 2nd frame
-                continue
-            
-            # Detect faces in frame
-            faces = face_app.get(frame)
+            frame_index += 1
+            run_detection = frame_index % 2 == 0
             
-            # Update tracker with current detections
-            tracked_faces = face_tracker.update(faces)
+            if run_detection:
+                # Detect faces in frame
+                faces = detect_faces(face_app, frame)
+                
+                # Update tracker with current detections
+                face_tracker.update(faces)
+            tracked_faces = face_tracker.tracks
             
             # Draw FPS
             cv2.putText(frame, f"FPS: {fps:.1f}", (10, 30),
@@ -356,23 +1224,17 @@ def realtime_recognition(camera_type=DEFAULT_CAMERA_TYPE, droidcam_url=DEFAULT_D
             # Process each tracked face
             for face_id, track_data in tracked_faces.items():
                 face_obj = track_data['face_obj']
-                current_embedding = track_data['embedding']
                 
                 # Draw bounding box
                 bbox = face_obj.bbox.astype(int)
                 cv2.rectangle(frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), (0, 255, 0), 2)
                 
-                # Find the closest match in the database
-                best_match_name = "Unknown"
-                best_match_score = 0
-                
-                for db_name, data in face_db.items():
-                    for embedding, _ in data["embeddings"]:
-                        similarity = np.dot(current_embedding, embedding)
-                        
-                        if similarity > best_match_score and similarity > 0.5:  # Threshold for similarity
-                            best_match_score = similarity
-                            best_match_name = data.get("display_name", db_name)
+                # Find the closest match in the database, or reuse the track's
+                # label on frames without detection
+                if run_detection:
+                    best_match_name, best_match_score = face_tracker.identify(track_data, face_matcher)
+                else:
+                    best_match_name, best_match_score = track_data['name'], track_data['score']
                 
                 # Draw name and confidence
                 confidence_text = f"{best_match_score:.2f}" if best_match_score > 0 else "?"
@@ -405,10 +1267,17 @@ if __name__ == "__main__":
                         help="Camera to use (laptop or droidcam)")
     parser.add_argument("--url", default=DEFAULT_DROIDCAM_URL, help="URL for DroidCam")
     parser.add_argument("--add-face", help="Add a face with the given name")
+    parser.add_argument("--reduce-dim", type=int, metavar="DIM",
+                        help=f"Fit a PCA projection so matching uses DIM-D embeddings "
+                             f"(e.g. {REDUCED_EMBEDDING_DIM}; {EMBEDDING_DIM} removes it)")
     
     args = parser.parse_args()
     
-    if args.add_face:
+    if args.reduce_dim is not None:
+        # Refit the matching projection on the stored embeddings
+        result = reduce_embedding_dim(args.reduce_dim)
+        print(result["message"])
+    elif args.add_face:
         # Add a face to the database
         result = add_face(args.add_face, args.camera, args.url)
         print(result["message"])
@@ -7,19 +7,85 @@ import argparse
 import threading
 import json
 import logging
+import logging.handlers
+import atexit
 import time
-import traceback
 import queue
 from datetime import datetime
-from flask import Flask, request, jsonify, Response, send_file
+from flask import Flask, request, jsonify, Response
+from flask.json.provider import JSONProvider
+from werkzeug.wsgi import FileWrapper, wrap_file
 from flask_cors import CORS
-from gevent.pywsgi import WSGIServer
+import gevent
+from gevent.pywsgi import WSGIServer, WSGIHandler
+from gevent.socket import wait_write
+import errno
 import subprocess
+import shutil
 import importlib
 import io
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# orjson encodes large responses several times faster than the stdlib json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# watchdog pushes face database changes instead of a stat per request
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message and traceback formatting to the listener thread"""
+    
+    def prepare(self, record):
+        return record
+    
+    def enqueue(self, record):
+        # Drop the record rather than block a request when stderr can't keep up
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+# Configure logging; records are queued and written to stderr by a listener
+# thread, so a burst of errors doesn't block requests on formatting and I/O.
+# The queue is bounded so a stalled stderr can't grow it without limit
+log_queue = queue.Queue(maxsize=10000)
+log_listener = None
+
+# PID of the process the listener thread runs in; a forked gunicorn worker
+# inherits log_listener, but not its thread
+log_listener_pid = None
+
+def start_log_listener():
+    """Start the thread that writes queued log records, if it isn't running in this process"""
+    global log_listener, log_listener_pid
+    if log_listener_pid == os.getpid():
+        return
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    log_listener.start()
+    log_listener_pid = os.getpid()
+
+def stop_log_listener():
+    """Flush queued log records and stop the listener thread, if it is running in this process"""
+    global log_listener_pid
+    if log_listener_pid != os.getpid():
+        return
+    
+    log_listener_pid = None
+    log_listener.stop()
+
+logging.basicConfig(level=logging.INFO, handlers=[DeferredQueueHandler(log_queue)])
+start_log_listener()
+atexit.register(stop_log_listener)
 logger = logging.getLogger(__name__)
 
 # Import the face_recognition_app module
@@ -33,12 +99,26 @@ try:
     face_recognition_app = importlib.import_module('face_recognition_app')
     logger.info("Successfully imported face_recognition_app module")
 except Exception as e:
-    logger.error(f"Error importing face_recognition_app module: {e}")
-    traceback.print_exc()
+    logger.exception(f"Error importing face_recognition_app module: {e}")
     sys.exit(1)
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, so jsonify() and request.json skip the stdlib encoder"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY), mimetype='application/json')
+
 # Initialize Flask application
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)  # Enable Cross-Origin Resource Sharing
 
 # Global variables
@@ -50,8 +130,19 @@ is_running = False
 recognition_results = queue.Queue(maxsize=10)
 last_recognition_result = None
 
+# Face metadata, reloaded only when meta.json changes on disk,
+# along with the encoded /get_saved_faces body and its ETag; with a watcher
+# running, meta.json is only stat'ed after it has flagged a change
+_DB_CACHE = {"mtime": None, "faces": None, "by_id": None, "saved_faces_body": None, "etag": None,
+             "dirty": True, "watcher": None, "lock": threading.Lock()}
+
+# Face matcher built from the full database, rebuilt when the database or its
+# matching projection changes
+_MATCHER_CACHE = {"key": None, "matcher": None, "lock": threading.Lock()}
+
 # Camera settings - IMPORTANT: Update this to match your DroidCam IP
-DROIDCAM_URL = "http://192.168.18.76:4747/video"
+# (gunicorn workers get the --camera value through the environment)
+DROIDCAM_URL = os.environ.get("DROIDCAM_URL", "http://192.168.18.76:4747/video")
 
 # Create the temporary directory for storing images if it doesn't exist
 TEMP_DIR = "temp_images"
@@ -71,7 +162,7 @@ def get_status():
                 "is_recognition_running": is_running
             }), 200
     except Exception as e:
-        logger.error(f"Error in status endpoint: {e}")
+        logger.exception(f"Error in status endpoint: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/add_face', methods=['POST'])
@@ -127,15 +218,50 @@ def add_face():
             }), 200
             
         except Exception as e:
-            logger.error(f"Error processing image: {e}")
-            traceback.print_exc()
+            logger.exception(f"Error processing image: {e}")
             return jsonify({"success": False, "message": f"Error processing image: {str(e)}"}), 500
     
     except Exception as e:
-        logger.error(f"Error in add_face endpoint: {e}")
-        traceback.print_exc()
+        logger.exception(f"Error in add_face endpoint: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
 
+# Queue of detected face crops waiting to be written to disk
+face_writer_queue = queue.Queue(maxsize=32)
+JPEG_QUALITY = 85
+
+def publish_recognition_result(result):
+    """Add a recognition result to the results queue, dropping the oldest if full"""
+    try:
+        recognition_results.put(result, block=False)
+    except queue.Full:
+        # Queue is full, remove oldest item and add new one
+        recognition_results.get()
+        recognition_results.put(result)
+
+def face_writer_worker():
+    """Writer thread that saves detected faces so disk and JPEG time stay off the recognition loop"""
+    while True:
+        img_path, face_img, result = face_writer_queue.get()
+        try:
+            cv2.imwrite(img_path, face_img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        except Exception as e:
+            logger.exception(f"Error saving detected face: {e}")
+        
+        # Publish after the write so clients can read the image right away
+        if result is not None:
+            publish_recognition_result(result)
+
+face_writer_thread = None
+
+def start_face_writer():
+    """Start the face writer thread if it isn't running in this process (threads don't survive a fork)"""
+    global face_writer_thread
+    if face_writer_thread is None or not face_writer_thread.is_alive():
+        face_writer_thread = threading.Thread(target=face_writer_worker, daemon=True)
+        face_writer_thread.start()
+
+start_face_writer()
+
 # Function to save recognized face and add to results queue
 def recognition_callback(face_obj, name, confidence):
     """Callback function that receives recognition results"""
@@ -152,9 +278,7 @@ def recognition_callback(face_obj, name, confidence):
         # Extract face from image
         face_img = face_obj.orig_img[bbox[1]:bbox[3], bbox[0]:bbox[2]]
         
-        # Save face image
         img_path = os.path.join(DETECTED_FACES_DIR, f"{name}_{timestamp}.jpg")
-        cv2.imwrite(img_path, face_img)
         
         # Create result object
         result = {
@@ -165,44 +289,38 @@ def recognition_callback(face_obj, name, confidence):
         }
         
         # Only add to queue if it's a new recognition (different from last one)
-        if last_recognition_result is None or last_recognition_result["name"] != name:
-            # Try to add to queue, but don't block if queue is full
-            try:
-                recognition_results.put(result, block=False)
-            except queue.Full:
-                # Queue is full, remove oldest item and add new one
-                recognition_results.get()
-                recognition_results.put(result)
-        
+        is_new = last_recognition_result is None or last_recognition_result["name"] != name
         last_recognition_result = result
         
+        # Hand the crop to the writer thread; it publishes the result once saved
+        try:
+            face_writer_queue.put_nowait((img_path, face_img.copy(), result if is_new else None))
+        except queue.Full:
+            logger.warning("Face writer queue is full, dropping detected face image")
+            if is_new:
+                publish_recognition_result(result)
+        
     except Exception as e:
-        logger.error(f"Error in recognition callback: {e}")
-        traceback.print_exc()
+        logger.exception(f"Error in recognition callback: {e}")
 
 # Custom face recognition worker that uses the callback
 def face_recognition_worker(droidcam_url):
     """Worker thread that runs face recognition and calls the callback with results"""
     try:
-        # Initialize face recognition
-        app = face_recognition_app.FaceAnalysis(name='buffalo_l', providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
-        app.prepare(ctx_id=0, det_size=(320, 320))
+        # Get the shared face recognition model
+        app = face_recognition_app.get_face_analysis()
         
-        # Load the face database
-        database_file = "faces_db/face_database.pkl"
-        if not os.path.exists(database_file):
+        # Get the shared matcher for the face database
+        face_matcher = _get_face_matcher()
+        if face_matcher is None:
             logger.error("Face database not found")
             return
         
-        with open(database_file, 'rb') as f:
-            face_db = face_recognition_app.pickle.load(f)
-        
         # Print database info
-        logger.info(f"Loaded database with {len(face_db)} identities:")
-        for db_name, data in face_db.items():
-            display_name = data.get("display_name", db_name)
-            samples = len(data["embeddings"])
-            logger.info(f"  - {display_name}: {samples} face samples")
+        faces, _ = _get_face_db()
+        logger.info(f"Loaded database with {len(faces)} identities:")
+        for face in faces:
+            logger.info(f"  - {face['display_name']}: {face['sample_count']} face samples")
         
         # Initialize camera
         camera = face_recognition_app.DroidCam(droidcam_url)
@@ -210,6 +328,9 @@ def face_recognition_worker(droidcam_url):
             logger.error("Could not open camera")
             return
         
+        # Read frames on a separate thread so camera I/O overlaps with inference
+        frame_reader = face_recognition_app.FrameReader(camera)
+        
         # Create face tracker
         face_tracker = face_recognition_app.FaceTracker(max_age=10)
         
@@ -226,11 +347,9 @@ def face_recognition_worker(droidcam_url):
                 if not is_running:
                     break
             
-            # Read frame from camera
-            ret, frame = camera.read()
-            if not ret or frame is None:
-                logger.error("Failed to grab frame")
-                time.sleep(0.1)
+            # Take the latest frame from the reader thread
+            ret, frame = frame_reader.read()
+            if not ret:
                 continue
             
             # Process every Nth frame for better performance
@@ -246,8 +365,12 @@ def face_recognition_worker(droidcam_url):
                 frame_count = 0
                 start_time = time.time()
             
-            # Detect faces in frame
-            faces = app.get(frame)
+            # Detect faces in frame and embed them in one batch
+            faces = face_recognition_app.detect_faces(app, frame)
+            
+            # The callback crops the face out of the frame it was detected in
+            for face in faces:
+                face.orig_img = frame
             
             # Update tracker with current detections
             tracked_faces = face_tracker.update(faces)
@@ -255,19 +378,9 @@ def face_recognition_worker(droidcam_url):
             # Process each tracked face
             for face_id, track_data in tracked_faces.items():
                 face_obj = track_data['face_obj']
-                current_embedding = track_data['embedding']
                 
                 # Find the closest match in the database
-                best_match_name = "Unknown"
-                best_match_score = 0
-                
-                for db_name, data in face_db.items():
-                    for embedding, _ in data["embeddings"]:
-                        similarity = np.dot(current_embedding, embedding)
-                        
-                        if similarity > best_match_score and similarity > 0.5:  # Threshold for similarity
-                            best_match_score = similarity
-                            best_match_name = data.get("display_name", db_name)
+                best_match_name, best_match_score = face_tracker.identify(track_data, face_matcher)
                 
                 # Call callback with recognition result
                 if best_match_name != "Unknown":
@@ -277,10 +390,11 @@ def face_recognition_worker(droidcam_url):
             time.sleep(0.01)
     
     except Exception as e:
-        logger.error(f"Error in face recognition worker: {e}")
-        traceback.print_exc()
+        logger.exception(f"Error in face recognition worker: {e}")
     finally:
         # Clean up
+        if 'frame_reader' in locals():
+            frame_reader.stop()
         if 'camera' in locals():
             camera.release()
 
@@ -314,8 +428,7 @@ def start_realtime_recognition():
             }), 200
             
         except Exception as e:
-            logger.error(f"Error starting real-time recognition: {e}")
-            traceback.print_exc()
+            logger.exception(f"Error starting real-time recognition: {e}")
             return jsonify({"success": False, "message": str(e)}), 500
 
 @app.route('/stop_realtime_recognition', methods=['POST'])
@@ -341,8 +454,7 @@ def stop_realtime_recognition():
             }), 200
             
         except Exception as e:
-            logger.error(f"Error stopping real-time recognition: {e}")
-            traceback.print_exc()
+            logger.exception(f"Error stopping real-time recognition: {e}")
             return jsonify({"success": False, "message": str(e)}), 500
 
 @app.route('/get_latest_recognition', methods=['GET'])
@@ -375,8 +487,7 @@ def get_latest_recognition():
         }), 200
         
     except Exception as e:
-        logger.error(f"Error getting latest recognition: {e}")
-        traceback.print_exc()
+        logger.exception(f"Error getting latest recognition: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
 
 @app.route('/take_photo', methods=['GET'])
@@ -407,106 +518,348 @@ def take_photo():
         }), 200
         
     except Exception as e:
-        logger.error(f"Error taking photo: {e}")
-        traceback.print_exc()
+        logger.exception(f"Error taking photo: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
 
-@app.route('/get_saved_faces', methods=['GET'])
-def get_saved_faces():
-    """Get the list of saved faces"""
+def encode_json(body):
+    """Encode a JSON body to bytes with orjson when it is installed, otherwise with the json module"""
+    if orjson is None:
+        return json.dumps(body, separators=(',', ':')).encode('utf-8')
+    return orjson.dumps(body, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def json_response(body, status=200):
+    """Build a JSON response, encoded by encode_json()"""
+    return Response(encode_json(body), status=status, mimetype='application/json')
+
+def _get_face_db():
+    """
+    Get the saved face metadata, reusing the previous load while meta.json is unchanged.
+    
+    Returns:
+        (faces, by_id) - the load_face_meta() list and the same entries keyed by face ID,
+        or (None, None) if there is no face database
+    """
+    with _DB_CACHE["lock"]:
+        watcher = _DB_CACHE["watcher"]
+        if (watcher is not None and watcher.is_alive() and not _DB_CACHE["dirty"]
+                and _DB_CACHE["faces"] is not None):
+            return _DB_CACHE["faces"], _DB_CACHE["by_id"]
+        
+        # Cleared before the stat, so a change flagged from here on is seen by the next call
+        _DB_CACHE["dirty"] = False
+        
+        # One stat per call while the cache is current; a legacy database is
+        # converted by the first load, after which meta.json exists
+        try:
+            mtime = os.stat(face_recognition_app.META_FILE).st_mtime_ns
+        except FileNotFoundError:
+            if not face_recognition_app.face_db_exists():
+                return None, None
+            mtime = None
+        
+        if mtime is None or mtime != _DB_CACHE["mtime"]:
+            faces = face_recognition_app.load_face_meta()
+            _DB_CACHE["faces"] = faces
+            _DB_CACHE["by_id"] = {face["id"]: face for face in faces}
+            _DB_CACHE["mtime"] = os.stat(face_recognition_app.META_FILE).st_mtime_ns
+            _DB_CACHE["saved_faces_body"] = None
+        
+        return _DB_CACHE["faces"], _DB_CACHE["by_id"]
+
+class FaceDbEventHandler(FileSystemEventHandler):
+    """Flags the face metadata cache for a recheck when meta.json or the projection changes"""
+    
+    def _flag_if_watched(self, event):
+        # Face images live in the same directory and are read on every
+        # /face_image request, so open/close events and other files are ignored
+        watched = (os.path.abspath(face_recognition_app.META_FILE),
+                   os.path.abspath(face_recognition_app.PROJECTION_FILE))
+        paths = (event.src_path, getattr(event, "dest_path", ""))
+        if any(path and os.path.abspath(os.fsdecode(path)) in watched for path in paths):
+            _DB_CACHE["dirty"] = True
+    
+    # Saves go through a temporary file and os.replace, which arrives as a move
+    on_created = _flag_if_watched
+    on_modified = _flag_if_watched
+    on_moved = _flag_if_watched
+    on_deleted = _flag_if_watched
+
+def start_db_watcher():
+    """Watch the face database directory with watchdog, if installed and not already running in this process"""
+    if Observer is None:
+        return
+    
+    watcher = _DB_CACHE["watcher"]
+    if watcher is not None and watcher.is_alive():
+        return
+    
+    observer = Observer()
+    observer.schedule(FaceDbEventHandler(), face_recognition_app.FACES_DB_DIR, recursive=False)
+    observer.daemon = True
     try:
-        # Get the list of saved faces from the database file
-        database_file = "faces_db/face_database.pkl"
-        if not os.path.exists(database_file):
-            return jsonify({"success": True, "faces": []}), 200
-        
-        # Load the database using face_recognition_app's code
-        faces = []
-        
-        # For each face in the database, return name and sample count
-        with open(database_file, 'rb') as f:
-            face_db = face_recognition_app.pickle.load(f)
+        observer.start()
+    except OSError as e:
+        # e.g. out of inotify watches; the cache falls back to a stat per call
+        logger.warning(f"Could not watch the face database, checking it on every request instead: {e}")
+        return
+
+    # Anything that changed before the watch began still needs one stat
+    _DB_CACHE["dirty"] = True
+    _DB_CACHE["watcher"] = observer
+
+def _get_saved_faces_body():
+    """
+    Get the encoded /get_saved_faces response body, rebuilt only when the face metadata changes.
+    
+    Returns:
+        (body bytes, ETag), or (None, None) if there is no face database
+    """
+    if _get_face_db()[0] is None:
+        return None, None
+    
+    with _DB_CACHE["lock"]:
+        if _DB_CACHE["saved_faces_body"] is None:
+            # Only the metadata is needed; sample counts are stored per face, so
+            # this is one pass over the faces and never over their embeddings
+            faces = [{
+                "id": face["id"],
+                "name": face["display_name"],
+                "sample_count": face["sample_count"],
+                "image_path": face["image_path"]
+            } for face in _DB_CACHE["faces"]]
             
-            for db_name, data in face_db.items():
-                display_name = data.get("display_name", db_name)
-                samples = len(data["embeddings"])
-                
-                # Get the first image path for this face if available
-                image_path = None
-                if "image_paths" in data and len(data["image_paths"]) > 0:
-                    image_path = data["image_paths"][0]
-                
-                faces.append({
-                    "id": db_name,
-                    "name": display_name,
-                    "sample_count": samples,
-                    "image_path": image_path
-                })
+            _DB_CACHE["saved_faces_body"] = encode_json({
+                "success": True,
+                "faces": faces
+            })
+            _DB_CACHE["etag"] = f"{_DB_CACHE['mtime']:x}"
         
-        return jsonify({
-            "success": True,
-            "faces": faces
-        }), 200
+        return _DB_CACHE["saved_faces_body"], _DB_CACHE["etag"]
+
+def _file_mtime(path):
+    """st_mtime_ns of a file, or None if it doesn't exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _get_face_matcher():
+    """Get a FaceMatcher for the saved faces, reusing the previous one while the database is unchanged"""
+    faces, _ = _get_face_db()
+    if faces is None:
+        return None
+    
+    with _MATCHER_CACHE["lock"]:
+        key = (_file_mtime(face_recognition_app.META_FILE), _file_mtime(face_recognition_app.PROJECTION_FILE))
+        if key != _MATCHER_CACHE["key"]:
+            _MATCHER_CACHE["matcher"] = face_recognition_app.load_face_matcher()
+            _MATCHER_CACHE["key"] = key
+        
+        return _MATCHER_CACHE["matcher"]
+
+def _warmup(fork_safe=False):
+    """
+    Load the model, face metadata and face matcher so the first requests don't pay for it.
+    
+    With fork_safe=True (the gunicorn master, before it forks workers) only the
+    metadata is cached; the model and matcher can hold CUDA state, which doesn't
+    survive a fork, so each worker loads those (and the matrices) on first use instead.
+    """
+    if not fork_safe:
+        logger.info("Loading face analysis model...")
+        face_recognition_app.get_face_analysis()
+        start_db_watcher()
+    
+    # The matcher maps the matrices, checking them against meta.json, and loads
+    # (or rebuilds) the FAISS index for large databases
+    faces, _ = _get_face_db()
+    if faces is not None:
+        logger.info("Loading face database...")
+        if fork_safe:
+            samples = sum(face["sample_count"] for face in faces)
+        else:
+            samples = len(_get_face_matcher().embeddings)
+        logger.info(f"Loaded {len(faces)} identities, {samples} face samples")
+
+@app.route('/rebuild_index', methods=['POST'])
+def rebuild_index():
+    """Rebuild the FAISS index over the saved faces"""
+    try:
+        # Training takes minutes on a large gallery; run it on a real thread
+        # (FAISS releases the GIL) so the hub keeps serving other requests
+        result = gevent.get_hub().threadpool.apply(face_recognition_app.build_face_index)
+        if not result["success"]:
+            return jsonify(result), 400
+        
+        # The index file isn't part of the matcher cache key, so force a rebuild
+        with _MATCHER_CACHE["lock"]:
+            _MATCHER_CACHE["key"] = None
+        return jsonify(result), 200
     
     except Exception as e:
-        logger.error(f"Error getting saved faces: {e}")
-        traceback.print_exc()
+        logger.exception(f"Error rebuilding face index: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
 
+@app.route('/get_saved_faces', methods=['GET'])
+def get_saved_faces():
+    """Get the list of saved faces"""
+    try:
+        # Get the list of saved faces, encoded once per change of the metadata
+        body, etag = _get_saved_faces_body()
+        if body is None:
+            return json_response({"success": True, "faces": []})
+        
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response
+    
+    except Exception as e:
+        logger.exception(f"Error getting saved faces: {e}")
+        return json_response({"success": False, "message": str(e)}, 500)
+
 @app.route('/face_image/<face_id>', methods=['GET'])
 def get_face_image(face_id):
     """Get a face image by ID"""
     try:
-        # Load the database
-        database_file = "faces_db/face_database.pkl"
-        if not os.path.exists(database_file):
-            return jsonify({"success": False, "message": "Face database not found"}), 404
+        # Look the face up in the cached metadata
+        _, faces = _get_face_db()
+        if faces is None:
+            return json_response({"success": False, "message": "Face database not found"}, 404)
         
-        with open(database_file, 'rb') as f:
-            face_db = face_recognition_app.pickle.load(f)
-            
-            if face_id not in face_db:
-                return jsonify({"success": False, "message": f"Face ID {face_id} not found"}), 404
-            
-            data = face_db[face_id]
-            if "image_paths" not in data or not data["image_paths"]:
-                return jsonify({"success": False, "message": "No image found for this face"}), 404
-            
-            image_path = data["image_paths"][0]
-            if not os.path.exists(image_path):
-                return jsonify({"success": False, "message": "Image file not found"}), 404
-            
-            # Return the image file
-            return send_file(image_path, mimetype='image/jpeg')
+        if face_id not in faces:
+            return json_response({"success": False, "message": f"Face ID {face_id} not found"}, 404)
+        
+        image_path = faces[face_id]["image_path"]
+        if not image_path:
+            return json_response({"success": False, "message": "No image found for this face"}, 404)
+        
+        # One stat gives existence, Content-Length and the validator
+        try:
+            st = os.stat(image_path)
+        except FileNotFoundError:
+            return json_response({"success": False, "message": "Image file not found"}, 404)
+        
+        etag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        
+        # Return the image file; under SendfileHandler the body goes out via os.sendfile
+        response = Response(wrap_file(request.environ, open(image_path, 'rb')),
+                            mimetype='image/jpeg', direct_passthrough=True)
+        response.content_length = st.st_size
+        response.last_modified = st.st_mtime
+        response.cache_control.no_cache = True
+        response.set_etag(etag)
+        return response.make_conditional(request.environ, accept_ranges=True, complete_length=st.st_size)
     
     except Exception as e:
-        logger.error(f"Error getting face image: {e}")
-        traceback.print_exc()
-        return jsonify({"success": False, "message": str(e)}), 500
+        logger.exception(f"Error getting face image: {e}")
+        return json_response({"success": False, "message": str(e)}, 500)
+
+class SendfileWrapper(FileWrapper):
+    """
+    wsgi.file_wrapper that SendfileHandler sends with os.sendfile instead of iterating.
+    
+    Iteration, close() and seek()/tell() come from werkzeug's FileWrapper, so
+    Range responses seek to the requested offset instead of reading up to it.
+    """
+
+class SendfileHandler(WSGIHandler):
+    """
+    WSGI handler that sends file responses straight from the page cache to the socket.
+    
+    gevent's socket.sendfile() falls back to read() + send(), so os.sendfile is
+    driven directly here, waiting on the event loop whenever the socket is full.
+    """
+    
+    def get_environ(self):
+        environ = super().get_environ()
+        environ['wsgi.file_wrapper'] = SendfileWrapper
+        return environ
+    
+    def process_result(self):
+        # Only plain HTTP responses with a known length can be sent as raw file bytes
+        if (not isinstance(self.result, SendfileWrapper) or self.response_use_chunked
+                or self.environ.get('wsgi.url_scheme') != 'http' or not hasattr(os, 'sendfile')):
+            return super().process_result()
+        
+        try:
+            in_fd = self.result.file.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return super().process_result()
+        
+        # Flush the headers, then let the kernel copy the body
+        self.write(b'')
+        out_fd = self.socket.fileno()
+        offset = self.result.file.tell()
+        while True:
+            try:
+                sent = os.sendfile(out_fd, in_fd, offset, 1 << 20)
+            except BlockingIOError:
+                wait_write(out_fd)
+                continue
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if sent == 0:
+                break
+            offset += sent
+            self.response_length += sent
 
 def main():
     """Main function to start the API server"""
+    global DROIDCAM_URL
+    
     parser = argparse.ArgumentParser(description="Face Recognition API Server")
     parser.add_argument("--host", default="0.0.0.0", help="Host to run the server on")
     parser.add_argument("--port", type=int, default=5000, help="Port to run the server on")
     parser.add_argument("--debug", action="store_true", help="Run in debug mode")
     parser.add_argument("--camera", default=DROIDCAM_URL, help="DroidCam URL")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of server processes; more than 1 runs gunicorn with gevent workers")
     
     args = parser.parse_args()
     
     # Update global camera URL if provided
-    global DROIDCAM_URL
     if args.camera:
         DROIDCAM_URL = args.camera
     
     logger.info(f"Using camera: {DROIDCAM_URL}")
+    
+    if args.workers > 1 and not args.debug:
+        if shutil.which("gunicorn") is None:
+            logger.error("gunicorn is not installed, falling back to a single server process")
+        else:
+            # gunicorn preloads this module in its master process, warms it up there
+            # (see gunicorn_conf.py) and then forks the workers
+            logger.info(f"Starting Face Recognition API Server on {args.host}:{args.port} with {args.workers} workers")
+            os.environ["DROIDCAM_URL"] = DROIDCAM_URL
+            stop_log_listener()  # exec skips atexit, so flush queued log records now
+            os.execvp("gunicorn", [
+                "gunicorn",
+                "-c", os.path.join(current_dir, "gunicorn_conf.py"),
+                "--pythonpath", current_dir,
+                "-w", str(args.workers),
+                "-b", f"{args.host}:{args.port}",
+                "face_recognition_server:app"
+            ])
+    
+    # Load and warm up the model and face database before accepting requests
+    _warmup()
+    
     logger.info(f"Starting Face Recognition API Server on {args.host}:{args.port}")
     
     if args.debug:
         app.run(host=args.host, port=args.port, debug=True)
     else:
         # Use gevent WSGI server for production
-        http_server = WSGIServer((args.host, args.port), app)
+        http_server = WSGIServer((args.host, args.port), app, handler_class=SendfileHandler)
         http_server.serve_forever()
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+"""
+Gunicorn settings for running face_recognition_server.py with several worker
+processes (python face_recognition_server.py --workers N).
+"""
+from gevent import monkey, socket
+from gunicorn.workers.ggevent import GeventWorker
+
+# Import the app once in the master, so the face metadata cache is filled
+# before the workers are forked (each worker maps the matrices itself)
+preload_app = True
+worker_class = "gunicorn_conf.RecognitionGeventWorker"
+
+class RecognitionGeventWorker(GeventWorker):
+    """
+    gevent worker that leaves threading and the modules real threads rely on unpatched.
+    
+    The stock worker patches threads into greenlets, which would run the
+    recognition loop and the face writer on the same hub as the requests.
+    Recognition state (running flag, latest results) is per worker process.
+    """
+    
+    def patch(self):
+        # queue and select stay unpatched too, since gevent's versions fail with
+        # LoopExit when used from real threads (the frame reader queue, the
+        # watchdog observer); ssl is left alone because the preloaded app has
+        # already imported it, and the server is plain HTTP
+        monkey.patch_all(thread=False, queue=False, select=False, ssl=False)
+        
+        # Same socket patching as GeventWorker.patch
+        sockets = []
+        for s in self.sockets:
+            sockets.append(socket.socket(s.FAMILY, socket.SOCK_STREAM,
+                                         fileno=s.sock.detach()))
+        self.sockets = sockets
+
+def when_ready(server):
+    """Warm up the parts of the server that are safe to share across a fork"""
+    import face_recognition_server
+    face_recognition_server._warmup(fork_safe=True)
+
+def post_fork(server, worker):
+    """Restart the per-process threads the fork left behind"""
+    import face_recognition_server
+    face_recognition_server.start_log_listener()
+    face_recognition_server.start_face_writer()
+
+def post_worker_init(worker):
+    """Start the face database watcher once the worker has set up gevent"""
+    import face_recognition_server
+    face_recognition_server.start_db_watcher()
@@ -1,5 +1,68 @@
+import os
+
+# Use every core for the CPU comparison; the thread pools read these when torch is imported
+CPU_THREADS = os.cpu_count() or 1
+os.environ.setdefault("OMP_NUM_THREADS", str(CPU_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(CPU_THREADS))
+
 import torch
 import time
+import statistics
+
+torch.set_num_threads(int(os.environ["OMP_NUM_THREADS"]))
+
+# Number of timed runs per benchmark; the median is reported
+BENCHMARK_RUNS = 10
+
+def time_gpu_matmul(a, b):
+    """Time a GPU matrix multiplication after a warm-up run, returning (result, median seconds)"""
+    # Warm-up run
+    torch.matmul(a, b)
+    torch.cuda.synchronize()
+    
+    # Benchmark with CUDA events, which time the kernel on the device rather
+    # than the Python launch and synchronize around it
+    times = []
+    for _ in range(BENCHMARK_RUNS):
+        start = torch.cuda.Event(enable_timing=True)
+        end = torch.cuda.Event(enable_timing=True)
+        start.record()
+        c = torch.matmul(a, b)
+        end.record()
+        end.synchronize()
+        times.append(start.elapsed_time(end) / 1000)
+    
+    return c, statistics.median(times)
+
+def time_gpu_matmul_graph(a, b, replays=50):
+    """Time a matrix multiplication captured in a CUDA graph, returning seconds per replay"""
+    c = torch.empty(a.shape[0], b.shape[1], device="cuda", dtype=a.dtype)
+    
+    # Warm up on a side stream so cuBLAS picks its kernel before capture
+    stream = torch.cuda.Stream()
+    stream.wait_stream(torch.cuda.current_stream())
+    with torch.cuda.stream(stream):
+        torch.matmul(a, b, out=c)
+    torch.cuda.current_stream().wait_stream(stream)
+    
+    graph = torch.cuda.CUDAGraph()
+    with torch.cuda.graph(graph):
+        torch.matmul(a, b, out=c)
+
+    # The first replay uploads the graph, keep it out of the timing
+    graph.replay()
+    torch.cuda.synchronize()
+
+    # Replays skip the Python dispatcher and kernel launch setup entirely
+    start = torch.cuda.Event(enable_timing=True)
+    end = torch.cuda.Event(enable_timing=True)
+    start.record()
+    for _ in range(replays):
+        graph.replay()
+    end.record()
+    end.synchronize()
+    
+    return start.elapsed_time(end) / 1000 / replays
 
 # Check if CUDA is available
 print(f"CUDA available: {torch.cuda.is_available()}")
@@ -29,31 +92,49 @@ if torch.cuda.is_available():
     a = torch.randn(size, size, device="cuda")
     b = torch.randn(size, size, device="cuda")
     
-    # Warm-up run
-    torch.matmul(a, b)
-    torch.cuda.synchronize()
+    # Plain FP32 on the CUDA cores
+    torch.backends.cuda.matmul.allow_tf32 = False
+    torch.backends.cudnn.allow_tf32 = False
+    c, gpu_time = time_gpu_matmul(a, b)
     
-    # Benchmark
-    start_time = time.time()
-    c = torch.matmul(a, b)
-    torch.cuda.synchronize()
-    gpu_time = time.time() - start_time
+    print(f"GPU time for {size}x{size} matrix multiplication: {gpu_time:.4f} seconds (median of {BENCHMARK_RUNS})")
     
-    print(f"GPU time for {size}x{size} matrix multiplication: {gpu_time:.4f} seconds")
+    graph_time = time_gpu_matmul_graph(a, b)
+    print(f"GPU time with CUDA graph replay: {graph_time:.4f} seconds")
+    
+    # Reduced-precision runs on the tensor cores (Ampere and newer for TF32/BF16)
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    _, tf32_time = time_gpu_matmul(a, b)
+    print(f"GPU time with TF32: {tf32_time:.4f} seconds ({gpu_time/tf32_time:.2f}x FP32)")
+    
+    for dtype_name, dtype in (("BF16", torch.bfloat16), ("FP16", torch.float16)):
+        if dtype == torch.bfloat16 and not torch.cuda.is_bf16_supported():
+            print(f"GPU time with {dtype_name}: not supported on this device")
+            continue
+        
+        c_half, half_time = time_gpu_matmul(a.to(dtype), b.to(dtype))
+        half_diff = torch.max(torch.abs(c_half.float() - c)).item()
+        print(f"GPU time with {dtype_name}: {half_time:.4f} seconds ({gpu_time/half_time:.2f}x FP32, "
+              f"max difference {half_diff:.4f})")
     
     # Compare with CPU
     a_cpu = a.cpu()
     b_cpu = b.cpu()
     
-    # Warm-up run
+    # Warm-up run, which also starts the CPU thread pool before timing
+    print(f"CPU threads: {torch.get_num_threads()}")
     torch.matmul(a_cpu, b_cpu)
     
     # Benchmark
-    start_time = time.time()
-    c_cpu = torch.matmul(a_cpu, b_cpu)
-    cpu_time = time.time() - start_time
+    times = []
+    for _ in range(BENCHMARK_RUNS):
+        start_time = time.perf_counter()
+        c_cpu = torch.matmul(a_cpu, b_cpu)
+        times.append(time.perf_counter() - start_time)
+    cpu_time = statistics.median(times)
     
-    print(f"CPU time for {size}x{size} matrix multiplication: {cpu_time:.4f} seconds")
+    print(f"CPU time for {size}x{size} matrix multiplication: {cpu_time:.4f} seconds (median of {BENCHMARK_RUNS})")
     print(f"GPU is {cpu_time/gpu_time:.2f}x faster than CPU")
     
     # Verify results match